@@ -7,69 +7,114 @@ Renders Markdown, syntax-highlights code, and browses directories.
 from flask import Flask, jsonify, request, send_from_directory, send_file
 from flask_cors import CORS
 import markdown
+from markdown.extensions.toc import nest_toc_tokens, slugify, unique
 import json
 import os
 import re
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
+import errno
+from functools import lru_cache
+import gzip
 import shutil
 import sys
+import threading
+import time
+
+try:
+    from blake3 import blake3 as _content_hash
+except ImportError:
+    from hashlib import sha256 as _content_hash
+
+try:
+    import cmarkgfm
+    from cmarkgfm.cmark import Options as CmarkOptions
+except ImportError:
+    cmarkgfm = None
+
+try:
+    import liburing
+except ImportError:
+    liburing = None
+
+try:
+    from PIL import Image
+    from PIL.ExifTags import TAGS
+except ImportError:
+    Image = None
 
 app = Flask(__name__)
 
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
 # ── Configuration ────────────────────────────────────────────────────────────
 
 CONFIG = {}
 
+# Normalized allowed_paths, precomputed by load_config for is_path_allowed
+ALLOWED_ROOTS = frozenset()
+ALLOWED_PREFIXES = ()
+
 def load_config():
     """Load configuration from config.json"""
-    global CONFIG
-    config_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'config.json')
+    global CONFIG, ALLOWED_ROOTS, ALLOWED_PREFIXES
+    config_path = os.path.join(APP_DIR, 'config.json')
     if not os.path.exists(config_path):
         print(f"ERROR: {config_path} not found. Copy config.example.json to config.json and edit it.")
         sys.exit(1)
     with open(config_path, 'r') as f:
         CONFIG = json.load(f)
+    bases = [base.rstrip('/') for base in CONFIG.get('allowed_paths', [])]
+    ALLOWED_ROOTS = frozenset(bases)
+    ALLOWED_PREFIXES = tuple(base + '/' for base in bases)
 
 # ── Path Security ────────────────────────────────────────────────────────────
 
 def is_path_allowed(filepath):
     """Check if the path is within allowed directories"""
     abs_path = os.path.realpath(filepath)
-    return any(
-        abs_path == base.rstrip('/') or abs_path.startswith(base.rstrip('/') + '/')
-        for base in CONFIG.get('allowed_paths', [])
-    )
+    return abs_path in ALLOWED_ROOTS or abs_path.startswith(ALLOWED_PREFIXES)
 
 # ── Path Conversion ─────────────────────────────────────────────────────────
 
+@lru_cache(maxsize=1024)
+def _convert_path_impl(path, prefix, target):
+    """Cached core of convert_path; the config values are part of the key"""
+    if prefix and path.upper().startswith(prefix.upper()):
+        path = target + path[len(prefix):]
+    path = path.replace('\\', '/')
+    return os.path.normpath(path)
+
 def convert_path(path):
     """Apply configured path conversion (e.g. Windows drive letter mapping)"""
     conversion = CONFIG.get('features', {}).get('path_conversion')
     if conversion and isinstance(conversion, dict):
-        prefix = conversion.get('from', '')
-        target = conversion.get('to', '')
-        if prefix and path.upper().startswith(prefix.upper()):
-            path = target + path[len(prefix):]
-    path = path.replace('\\', '/')
-    return os.path.normpath(path)
+        return _convert_path_impl(path, conversion.get('from', ''), conversion.get('to', ''))
+    return _convert_path_impl(path, '', '')
 
 # ── Internal Link Conversion ────────────────────────────────────────────────
 
+_MD_LINK_RE = re.compile(r'<a href="([^"]+\.md)"[^>]*>([^<]+)</a>')
+
 def convert_internal_links(html, base_path):
     """Convert internal MD links to viewer links"""
+    # Every match of _MD_LINK_RE contains '.md"', so most documents skip the regex
+    if '.md"' not in html:
+        return html
+    base_dir = os.path.dirname(base_path)
+
     def replace_link(match):
         href = match.group(1)
         text = match.group(2)
         if not href.endswith('.md'):
             return match.group(0)
         if not href.startswith('/'):
-            href = os.path.join(os.path.dirname(base_path), href)
+            href = os.path.join(base_dir, href)
             href = os.path.normpath(href)
         return f'<a href="?file={href}">{text}</a>'
 
-    pattern = r'<a href="([^"]+\.md)"[^>]*>([^<]+)</a>'
-    html = re.sub(pattern, replace_link, html)
-    return html
+    return _MD_LINK_RE.sub(replace_link, html)
 
 def convert_relative_images(html, base_path):
     """Convert relative image src paths to /api/image?file=... URLs"""
@@ -93,23 +138,27 @@ def convert_relative_images(html, base_path):
 
 # ── Helpers ──────────────────────────────────────────────────────────────────
 
+_SIZE_UNITS = ('B', 'KB', 'MB', 'GB', 'TB')
+
 def format_size(size):
     """Format file size for humans"""
-    for unit in ['B', 'KB', 'MB', 'GB']:
-        if size < 1024:
-            return f"{size:.1f} {unit}"
-        size /= 1024
-    return f"{size:.1f} TB"
+    if size <= 0:
+        return "0.0 B"
+    unit = min((size.bit_length() - 1) // 10, 4)
+    return f"{size / (1 << (10 * unit)):.1f} {_SIZE_UNITS[unit]}"
 
-VIEWABLE_EXTENSIONS = [
+VIEWABLE_EXTENSIONS = frozenset({
     '.md', '.json', '.yaml', '.yml', '.txt', '.py', '.sh', '.js',
     '.html', '.css', '.xml', '.ini', '.conf', '.log', '.toml',
     '.cfg', '.env', '.rs', '.go', '.java', '.c', '.cpp', '.h',
     '.ts', '.tsx', '.jsx', '.sql', '.r', '.rb', '.php', '.pl',
     '.lua', '.vim', '.csv', '.diff', '.patch', '.bat', '.ps1',
-]
+})
+
+IMAGE_EXTENSIONS = frozenset({'.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp', '.svg', '.ico', '.tiff', '.tif'})
 
-IMAGE_EXTENSIONS = ['.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp', '.svg', '.ico', '.tiff', '.tif']
+# Extensionless files are listed as viewable too (shown as plain text)
+ALL_VIEWABLE = VIEWABLE_EXTENSIONS | IMAGE_EXTENSIONS | {''}
 
 LANG_MAP = {
     '.json': 'json', '.yaml': 'yaml', '.yml': 'yaml',
@@ -136,11 +185,50 @@ ICON_MAP = {
     '.ts': '📜', '.tsx': '📜', '.jsx': '📜',
 }
 
+def _file_etag(st, variant=''):
+    """ETag value for a file version, derived from its mtime and size plus an optional variant"""
+    etag = f'{st.st_mtime_ns:x}-{st.st_size:x}'
+    return f'{etag}-{variant}' if variant else etag
+
+def _conditional_json(payload, st, variant=''):
+    """JSON response with ETag/Last-Modified; becomes 304 if the client copy is current"""
+    resp = jsonify(payload)
+    resp.set_etag(_file_etag(st, variant), weak=True)
+    resp.last_modified = st.st_mtime
+    # Caches must revalidate before reuse, or edits would not show up
+    resp.cache_control.no_cache = True
+    return resp.make_conditional(request)
+
 # ── API: Serve Frontend ─────────────────────────────────────────────────────
 
+INDEX_MAX_AGE = 3600
+INDEX_GZ_AVAILABLE = False
+
+def prepare_index_gz():
+    """Write index.html.gz next to index.html if missing or stale; return whether it can be served"""
+    src = os.path.join(APP_DIR, 'index.html')
+    dst = src + '.gz'
+    try:
+        if not os.path.exists(dst) or os.path.getmtime(dst) < os.path.getmtime(src):
+            with open(src, 'rb') as f:
+                data = gzip.compress(f.read(), compresslevel=9)
+            tmp = f'{dst}.{os.getpid()}.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(data)
+            os.replace(tmp, dst)
+        return True
+    except OSError:
+        return False
+
 @app.route('/')
 def serve_index():
-    return send_from_directory(os.path.dirname(os.path.abspath(__file__)), 'index.html')
+    if INDEX_GZ_AVAILABLE and request.accept_encodings['gzip']:
+        resp = send_from_directory(APP_DIR, 'index.html.gz', mimetype='text/html', max_age=INDEX_MAX_AGE)
+        resp.headers['Content-Encoding'] = 'gzip'
+    else:
+        resp = send_from_directory(APP_DIR, 'index.html', max_age=INDEX_MAX_AGE)
+    resp.vary.add('Accept-Encoding')
+    return resp
 
 # ── API: Config ──────────────────────────────────────────────────────────────
 
@@ -157,6 +245,275 @@ def get_config():
 
 # ── API: View File ───────────────────────────────────────────────────────────
 
+# Building a Markdown instance loads every extension (codehilite pulls in
+# Pygments), so one instance is shared and reset between documents.
+_MD = markdown.Markdown(extensions=[
+    'tables', 'fenced_code', 'codehilite', 'toc', 'meta', 'nl2br'
+])
+_MD_LOCK = threading.Lock()
+
+# Same rules as the markdown 'meta' extension, so both renderers accept the same files
+_META_BEGIN_RE = re.compile(r'^-{3}(\s.*)?')
+_META_END_RE = re.compile(r'^(-{3}|\.{3})(\s.*)?')
+_META_RE = re.compile(r'^[ ]{0,3}(?P<key>[A-Za-z0-9_-]+):\s*(?P<value>.*)')
+_META_MORE_RE = re.compile(r'^[ ]{4,}(?P<value>.*)')
+
+_HEADING_RE = re.compile(r'<h([1-6])>(.*?)</h\1>', re.DOTALL)
+_TAG_RE = re.compile(r'<[^>]+>')
+
+def _use_cmark():
+    """Whether Markdown is rendered with cmarkgfm (C) instead of python-markdown"""
+    return cmarkgfm is not None and not CONFIG.get('features', {}).get('legacy_markdown')
+
+def _md_renderer():
+    """Name of the active Markdown renderer, for cache keys and ETags"""
+    return 'cmark' if _use_cmark() else 'markdown'
+
+def _split_meta(content):
+    """Strip a leading meta-data block, returning (meta, remaining content)"""
+    lines = content.split('\n')
+    meta = {}
+    key = None
+    if lines and _META_BEGIN_RE.match(lines[0]):
+        lines.pop(0)
+    while lines:
+        line = lines.pop(0)
+        if line.strip() == '' or _META_END_RE.match(line):
+            break
+        match = _META_RE.match(line)
+        if match:
+            key = match.group('key').lower().strip()
+            meta.setdefault(key, []).append(match.group('value').strip())
+            continue
+        match = _META_MORE_RE.match(line)
+        if match and key:
+            meta[key].append(match.group('value').strip())
+            continue
+        lines.insert(0, line)
+        break
+    return meta, '\n'.join(lines)
+
+def _toc_list_html(tokens):
+    """Nested <ul> for TOC tokens, in the same layout the 'toc' extension emits"""
+    items = []
+    for token in tokens:
+        item = f'<li><a href="#{token["id"]}">{token["name"]}</a>'
+        if token['children']:
+            item += _toc_list_html(token['children'])
+        items.append(item + '</li>')
+    if not items:
+        return '<ul></ul>\n'
+    return '<ul>\n' + '\n'.join(items) + '\n</ul>\n'
+
+def _add_heading_ids(html):
+    """Add 'toc'-extension heading ids, build the nested TOC and expand [TOC] markers"""
+    import html as html_module
+    ids = set()
+    tokens = []
+
+    def replace_heading(match):
+        level, inner = match.group(1), match.group(2)
+        text = html_module.unescape(_TAG_RE.sub('', inner)).strip()
+        slug = unique(slugify(text, '-'), ids)
+        tokens.append({'level': int(level), 'id': slug, 'name': html_module.escape(text)})
+        return f'<h{level} id="{slug}">{inner}</h{level}>'
+
+    html = _HEADING_RE.sub(replace_heading, html)
+    toc = '<div class="toc">\n' + _toc_list_html(nest_toc_tokens(tokens)) + '</div>\n'
+    html = html.replace('<p>[TOC]</p>', toc)
+    return html, toc
+
+def _render_md(content, path):
+    """Render Markdown to sanitized HTML, returning (html, toc, meta)"""
+    if _use_cmark():
+        meta, body = _split_meta(content)
+        # UNSAFE keeps raw HTML like python-markdown does; it is sanitized below.
+        # GFM's tagfilter is left out so <script> etc. get removed there
+        # instead of showing up as escaped text.
+        html = cmarkgfm.markdown_to_html_with_extensions(
+            body, options=CmarkOptions.CMARK_OPT_HARDBREAKS | CmarkOptions.CMARK_OPT_UNSAFE,
+            extensions=['table', 'strikethrough', 'autolink', 'tasklist'])
+        html, toc = _add_heading_ids(html)
+    else:
+        with _MD_LOCK:
+            _MD.reset()
+            html = _MD.convert(content)
+            meta = dict(getattr(_MD, 'Meta', {}))
+            toc = getattr(_MD, 'toc', '')
+    # Sanitize HTML to prevent XSS (defense-in-depth, frontend uses DOMPurify too)
+    import re as _re
+    html = _re.sub(r'<script[^>]*>.*?</script>', '', html, flags=_re.DOTALL | _re.IGNORECASE)
+    html = _re.sub(r'<iframe[^>]*>.*?</iframe>', '', html, flags=_re.DOTALL | _re.IGNORECASE)
+    html = _re.sub(r'<object[^>]*>.*?</object>', '', html, flags=_re.DOTALL | _re.IGNORECASE)
+    html = _re.sub(r'<embed[^>]*/?>', '', html, flags=_re.IGNORECASE)
+    html = _re.sub(r'<style[^>]*>.*?</style>', '', html, flags=_re.DOTALL | _re.IGNORECASE)
+    html = _re.sub(r'<meta[^>]*>', '', html, flags=_re.IGNORECASE)
+    html = _re.sub(r'<form[^>]*>.*?</form>', '', html, flags=_re.DOTALL | _re.IGNORECASE)
+    html = _re.sub(r'\bon\w+\s*=\s*["\'][^"\']*["\']', '', html, flags=_re.IGNORECASE)
+    html = _re.sub(r'\bon\w+\s*=\s*[^\s>]+', '', html, flags=_re.IGNORECASE)
+    html = _re.sub(r'<a\s([^>]*)href\s*=\s*["\']javascript:[^"\']*["\']', '<a \\1href="#"', html, flags=_re.IGNORECASE)
+    html = _re.sub(r'<a\s([^>]*)href\s*=\s*["\']data:[^"\']*["\']', '<a \\1href="#"', html, flags=_re.IGNORECASE)
+    html = convert_internal_links(html, path)
+    html = convert_relative_images(html, path)
+    return html, toc, meta
+
+# Bump when rendering output changes so stale on-disk entries are ignored
+RENDER_CACHE_VERSION = 2
+
+def _render_cache_dir():
+    """Directory for persisted Markdown renders (None/empty disables it)"""
+    default = os.path.join(os.environ.get('XDG_CACHE_HOME') or os.path.expanduser('~/.cache'), 'fileview')
+    cache_dir = CONFIG.get('cache_dir', default)
+    return cache_dir and os.path.expanduser(os.path.expandvars(cache_dir))
+
+def _cache_path(hash_hex):
+    """Location of a cache entry, fanned out by the first two hex digits"""
+    return os.path.join(_render_cache_dir(), hash_hex[:2], hash_hex)
+
+RENDER_CACHE_PRUNE_INTERVAL = 24 * 3600
+_CACHE_SUBDIR_RE = re.compile(r'[0-9a-f]{2}')
+# A finished entry, or a temporary file left behind by an interrupted write
+_CACHE_ENTRY_RE = re.compile(r'([0-9a-f]{64})(?:\.\d+\.\d+\.tmp)?')
+_last_cache_prune = 0.0
+_cache_prune_lock = threading.Lock()
+
+def prune_render_cache(min_interval=0):
+    """Delete cache entries not used within cache_max_age_days
+
+    Does nothing if another thread is already pruning or the last prune
+    was less than min_interval seconds ago.
+    """
+    global _last_cache_prune
+    if not _cache_prune_lock.acquire(blocking=False):
+        return
+    try:
+        now = time.time()
+        if now - _last_cache_prune < min_interval:
+            return
+        _last_cache_prune = now
+        cache_dir = _render_cache_dir()
+        if cache_dir and os.path.isdir(cache_dir):
+            _prune_cache_entries(cache_dir, now - CONFIG.get('cache_max_age_days', 30) * 86400)
+    finally:
+        _cache_prune_lock.release()
+
+def _prune_cache_entries(cache_dir, cutoff):
+    """Remove cache entries and stale temporary files last modified before cutoff"""
+    # Only ever touch files we wrote: cache_dir may be shared or misconfigured
+    try:
+        with os.scandir(cache_dir) as it:
+            subdirs = [d.path for d in it
+                       if _CACHE_SUBDIR_RE.fullmatch(d.name) and d.is_dir(follow_symlinks=False)]
+    except OSError:
+        return
+    for subdir in subdirs:
+        prefix = os.path.basename(subdir)
+        try:
+            with os.scandir(subdir) as entries:
+                for entry in entries:
+                    match = _CACHE_ENTRY_RE.fullmatch(entry.name)
+                    if not match or not match.group(1).startswith(prefix) or not entry.is_file(follow_symlinks=False):
+                        continue
+                    try:
+                        if entry.stat(follow_symlinks=False).st_mtime < cutoff:
+                            os.remove(entry.path)
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+
+def _render_md_cached(content, path):
+    """Render Markdown via the on-disk cache, keyed by a hash of path and content"""
+    cache_dir = _render_cache_dir()
+    if not cache_dir:
+        return _render_md(content, path)
+
+    # The path is part of the key because relative links resolve against it,
+    # and the allowed roots because they decide which images get rewritten
+    renderer = _md_renderer()
+    roots = '\0'.join(sorted(ALLOWED_ROOTS))
+    digest = _content_hash(f'{RENDER_CACHE_VERSION}\0{renderer}\0{roots}\0{path}\0'.encode('utf-8'))
+    digest.update(content.encode('utf-8'))
+    cache_file = _cache_path(digest.hexdigest())
+
+    try:
+        with open(cache_file, 'r', encoding='utf-8') as f:
+            entry = json.load(f)
+        os.utime(cache_file)  # mark as recently used so pruning keeps it
+        return entry['html'], entry['toc'], entry['meta']
+    except (OSError, ValueError, KeyError):
+        pass
+
+    html, toc, meta = _render_md(content, path)
+    try:
+        # Rendered documents may be private: keep the cache owner-only
+        os.makedirs(cache_dir, mode=0o700, exist_ok=True)
+        os.makedirs(os.path.dirname(cache_file), mode=0o700, exist_ok=True)
+        tmp_file = f'{cache_file}.{os.getpid()}.{threading.get_ident()}.tmp'
+        fd = os.open(tmp_file, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with open(fd, 'w', encoding='utf-8') as f:
+            json.dump({'html': html, 'toc': toc, 'meta': meta}, f)
+        os.replace(tmp_file, cache_file)
+    except OSError:
+        pass
+
+    if time.time() - _last_cache_prune > RENDER_CACHE_PRUNE_INTERVAL:
+        prune_render_cache(RENDER_CACHE_PRUNE_INTERVAL)
+    return html, toc, meta
+
+# Larger files are rendered on every request rather than pinned in the LRU
+RENDER_CACHE_MAX_SIZE = 256 * 1024
+# Budget for rendered output held per process (escaped HTML outgrows its source)
+RENDER_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+def _render_file(path, ext):
+    """Render a viewable file to (html, toc, meta, raw_length)"""
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        content = f.read()
+
+    if ext == '.md':
+        html, toc, meta = _render_md_cached(content, path)
+    else:
+        lang = LANG_MAP.get(ext, 'text')
+        import html as html_module
+        escaped_content = html_module.escape(content)
+        html = f'<pre><code class="language-{lang}">{escaped_content}</code></pre>'
+        meta = {}
+        toc = ''
+    return html, toc, meta, len(content)
+
+# (path, ext) -> (mtime_ns, size, rendered, cost), least recently used first
+_render_cache = OrderedDict()
+_render_cache_bytes = 0
+_render_cache_lock = threading.Lock()
+
+def _render_file_cached(path, mtime_ns, size, ext):
+    """_render_file, cached until the file's mtime or size changes"""
+    global _render_cache_bytes
+    key = (path, ext)
+    with _render_cache_lock:
+        cached = _render_cache.get(key)
+        if cached and cached[:2] == (mtime_ns, size):
+            _render_cache.move_to_end(key)
+            return cached[2]
+
+    rendered = _render_file(path, ext)
+    html, toc = rendered[:2]
+    cost = len(html) + len(toc)
+    if cost > RENDER_CACHE_MAX_BYTES // 8:
+        return rendered
+
+    with _render_cache_lock:
+        stale = _render_cache.pop(key, None)
+        if stale:
+            _render_cache_bytes -= stale[3]
+        _render_cache[key] = (mtime_ns, size, rendered, cost)
+        _render_cache_bytes += cost
+        while _render_cache_bytes > RENDER_CACHE_MAX_BYTES:
+            _, evicted = _render_cache.popitem(last=False)
+            _render_cache_bytes -= evicted[3]
+    return rendered
+
 @app.route('/api/view')
 def view_file():
     """Read and render a file (Markdown → HTML, code → syntax-highlighted)"""
@@ -176,40 +533,19 @@ def view_file():
         return jsonify({'error': f'File not found: {filepath}'}), 404
 
     try:
-        with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
-            content = f.read()
-
-        if file_ext == '.md':
-            md = markdown.Markdown(extensions=[
-                'tables', 'fenced_code', 'codehilite', 'toc', 'meta', 'nl2br'
-            ])
-            html = md.convert(content)
-            # Sanitize HTML to prevent XSS (defense-in-depth, frontend uses DOMPurify too)
-            import re as _re
-            html = _re.sub(r'<script[^>]*>.*?</script>', '', html, flags=_re.DOTALL | _re.IGNORECASE)
-            html = _re.sub(r'<iframe[^>]*>.*?</iframe>', '', html, flags=_re.DOTALL | _re.IGNORECASE)
-            html = _re.sub(r'<object[^>]*>.*?</object>', '', html, flags=_re.DOTALL | _re.IGNORECASE)
-            html = _re.sub(r'<embed[^>]*/?>', '', html, flags=_re.IGNORECASE)
-            html = _re.sub(r'<style[^>]*>.*?</style>', '', html, flags=_re.DOTALL | _re.IGNORECASE)
-            html = _re.sub(r'<meta[^>]*>', '', html, flags=_re.IGNORECASE)
-            html = _re.sub(r'<form[^>]*>.*?</form>', '', html, flags=_re.DOTALL | _re.IGNORECASE)
-            html = _re.sub(r'\bon\w+\s*=\s*["\'][^"\']*["\']', '', html, flags=_re.IGNORECASE)
-            html = _re.sub(r'\bon\w+\s*=\s*[^\s>]+', '', html, flags=_re.IGNORECASE)
-            html = _re.sub(r'<a\s([^>]*)href\s*=\s*["\']javascript:[^"\']*["\']', '<a \\1href="#"', html, flags=_re.IGNORECASE)
-            html = _re.sub(r'<a\s([^>]*)href\s*=\s*["\']data:[^"\']*["\']', '<a \\1href="#"', html, flags=_re.IGNORECASE)
-            html = convert_internal_links(html, filepath)
-            html = convert_relative_images(html, filepath)
-            meta = getattr(md, 'Meta', {})
-            toc = getattr(md, 'toc', '')
+        st = os.stat(filepath)
+        # The same file renders differently under the other Markdown renderer
+        renderer = _md_renderer()
+        # Client already has this version: skip rendering entirely
+        if request.if_none_match.contains_weak(_file_etag(st, renderer)):
+            return _conditional_json({}, st, renderer)
+
+        if st.st_size <= RENDER_CACHE_MAX_SIZE:
+            html, toc, meta, raw_length = _render_file_cached(filepath, st.st_mtime_ns, st.st_size, file_ext)
         else:
-            lang = LANG_MAP.get(file_ext, 'text')
-            import html as html_module
-            escaped_content = html_module.escape(content)
-            html = f'<pre><code class="language-{lang}">{escaped_content}</code></pre>'
-            meta = {}
-            toc = ''
+            html, toc, meta, raw_length = _render_file(filepath, file_ext)
 
-        return jsonify({
+        return _conditional_json({
             'success': True,
             'file': filepath,
             'filename': os.path.basename(filepath),
@@ -217,8 +553,8 @@ def view_file():
             'html': html,
             'toc': toc,
             'meta': meta,
-            'raw_length': len(content),
-        })
+            'raw_length': raw_length,
+        }, st, renderer)
 
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -227,7 +563,7 @@ def view_file():
 
 @app.route('/api/raw')
 def get_raw():
-    """Return raw file content as plain text"""
+    """Return raw file content as plain text (streamed from disk)"""
     filepath = request.args.get('file', '')
 
     if not filepath or not is_path_allowed(filepath):
@@ -237,13 +573,136 @@ def get_raw():
         return jsonify({'error': 'Not found'}), 404
 
     try:
-        with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
-            return f.read(), 200, {'Content-Type': 'text/plain; charset=utf-8'}
+        # ?decode=1 re-encodes invalid UTF-8 with replacement characters
+        if request.args.get('decode') == '1':
+            with open(filepath, 'r', encoding='utf-8', errors='replace') as f:
+                return f.read(), 200, {'Content-Type': 'text/plain; charset=utf-8'}
+        return send_file(filepath, mimetype='text/plain', conditional=True)
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 # ── API: Browse Directory ────────────────────────────────────────────────────
 
+BROWSE_PARALLEL_THRESHOLD = 200
+BROWSE_MAX_WORKERS = 16
+
+IO_URING_BATCH = 256
+
+def _make_item(name, path, is_dir, size, mtime):
+    """Build a directory listing item"""
+    if is_dir:
+        return {
+            'name': name,
+            'type': 'directory',
+            'path': path,
+            'size': 0,
+            'mtime': mtime,
+            'icon': '📁',
+        }
+    ext = os.path.splitext(name)[1].lower()
+    return {
+        'name': name,
+        'type': 'file',
+        'path': path,
+        'size': size,
+        'size_human': format_size(size),
+        'mtime': mtime,
+        'extension': ext,
+        'viewable': ext in ALL_VIEWABLE,
+        'icon': ICON_MAP.get(ext, '📄'),
+    }
+
+def _entry_to_dict(entry):
+    """Build a listing item from a DirEntry, or None if it can't be stat'ed"""
+    # DirEntry caches the stat result; broken symlinks raise here
+    try:
+        st = entry.stat()
+        return _make_item(entry.name, entry.path, entry.is_dir(), st.st_size, st.st_mtime)
+    except (OSError, IOError):
+        return None
+
+def _use_io_uring():
+    """Whether directory listings stat entries through io_uring"""
+    return liburing is not None and CONFIG.get('features', {}).get('io_uring')
+
+def _is_utf8_path(path):
+    """False for names with undecodable bytes (surrogate-escaped by os.scandir)"""
+    try:
+        path.encode('utf-8')
+        return True
+    except UnicodeEncodeError:
+        return False
+
+# Statx buffers of rings that could not be drained; the kernel may still write to them
+_abandoned_io_uring_buffers = []
+
+def _stat_entries_io_uring(entries):
+    """Like mapping _entry_to_dict, but submitting statx calls in io_uring batches.
+
+    Returns None if io_uring is unavailable (old kernel, seccomp-filtered) or
+    fails for any reason other than a single entry's statx, so the caller
+    falls back to the scandir path.
+    """
+    results = [None] * len(entries)
+    ring = liburing.Ring()
+    cqe = liburing.Cqe()
+    try:
+        liburing.io_uring_queue_init(IO_URING_BATCH, ring)
+    except OSError:
+        return None
+
+    # The kernel reads paths and fills buffers asynchronously, so the current
+    # batch and its buffers stay referenced until every completion is reaped
+    batch = buffers = ()
+    in_flight = 0
+    try:
+        for start in range(0, len(entries), IO_URING_BATCH):
+            batch = entries[start:start + IO_URING_BATCH]
+            buffers = [liburing.Statx() for _ in batch]
+            for i, (entry, buf) in enumerate(zip(batch, buffers)):
+                if not _is_utf8_path(entry.path):
+                    # The binding only takes str paths it can encode as UTF-8;
+                    # non-UTF-8 names (common on NAS/Samba shares) use plain stat()
+                    results[start + i] = _entry_to_dict(entry)
+                    continue
+                sqe = liburing.io_uring_get_sqe(ring)
+                liburing.io_uring_prep_statx(sqe, buf, entry.path)
+                liburing.io_uring_sqe_set_data64(sqe, i)
+            in_flight = liburing.io_uring_submit(ring)
+
+            # Reap one completion at a time: cqe[0] is always the current head,
+            # so indices never run past the end of the completion ring
+            while in_flight:
+                liburing.io_uring_wait_cqe(ring, cqe)
+                completion = cqe[0]
+                i = completion.user_data
+                try:
+                    completion.res  # raises OSError for failed statx (e.g. broken symlink)
+                    ok = True
+                except OSError:
+                    ok = False
+                liburing.io_uring_cqe_seen(ring, completion)
+                in_flight -= 1
+                if i >= len(batch):
+                    raise RuntimeError(f'unexpected io_uring completion {i}')
+                if ok:
+                    buf = buffers[i]
+                    results[start + i] = _make_item(batch[i].name, batch[i].path, buf.isdir, buf.size, buf.mtime)
+        return results
+    except Exception:
+        return None
+    finally:
+        try:
+            while in_flight:
+                liburing.io_uring_wait_cqe(ring, cqe)
+                liburing.io_uring_cqe_seen(ring, cqe[0])
+                in_flight -= 1
+        except Exception:
+            # Can't confirm the kernel is done with these buffers: never free them
+            _abandoned_io_uring_buffers.append((ring, batch, buffers))
+        else:
+            liburing.io_uring_queue_exit(ring)
+
 @app.route('/api/browse')
 def browse_directory():
     """List directory contents with navigation"""
@@ -275,47 +734,32 @@ def browse_directory():
                 'icon': '⬆️',
             })
 
-        for entry in sorted(os.listdir(directory)):
-            if entry.startswith('.'):
-                continue
-
-            full_path = os.path.join(directory, entry)
-
-            if os.path.islink(full_path) and not os.path.exists(full_path):
+        with os.scandir(directory) as it:
+            entries = sorted(
+                (e for e in it if not e.name.startswith('.')),
+                key=lambda e: e.name,
+            )
+
+        results = _stat_entries_io_uring(entries) if _use_io_uring() else None
+        if results is None:
+            # stat() releases the GIL, so large (cold-cache) listings stat in parallel
+            if len(entries) > BROWSE_PARALLEL_THRESHOLD:
+                with ThreadPoolExecutor(max_workers=BROWSE_MAX_WORKERS) as pool:
+                    results = list(pool.map(_entry_to_dict, entries))
+            else:
+                results = [_entry_to_dict(e) for e in entries]
+
+        dir_count = file_count = viewable_count = 0
+        for item in results:
+            if item is None:
                 continue
-
-            try:
-                if os.path.isdir(full_path):
-                    items.append({
-                        'name': entry,
-                        'type': 'directory',
-                        'path': full_path,
-                        'size': 0,
-                        'mtime': os.path.getmtime(full_path),
-                        'icon': '📁',
-                    })
-                else:
-                    ext = os.path.splitext(entry)[1].lower()
-                    size = os.path.getsize(full_path)
-                    viewable = ext in VIEWABLE_EXTENSIONS or ext in IMAGE_EXTENSIONS or ext == ''
-
-                    items.append({
-                        'name': entry,
-                        'type': 'file',
-                        'path': full_path,
-                        'size': size,
-                        'size_human': format_size(size),
-                        'mtime': os.path.getmtime(full_path),
-                        'extension': ext,
-                        'viewable': viewable,
-                        'icon': ICON_MAP.get(ext, '📄'),
-                    })
-            except (OSError, IOError):
-                continue
-
-        dir_count = sum(1 for i in items if i['type'] == 'directory')
-        file_count = sum(1 for i in items if i['type'] == 'file')
-        viewable_count = sum(1 for i in items if i.get('viewable', False))
+            items.append(item)
+            if item['type'] == 'directory':
+                dir_count += 1
+            else:
+                file_count += 1
+                if item['viewable']:
+                    viewable_count += 1
 
         return jsonify({
             'success': True,
@@ -360,6 +804,8 @@ def check_path():
 
 # ── API: Image Preview ───────────────────────────────────────────────────────
 
+IMAGE_MAX_AGE = 86400
+
 @app.route('/api/image')
 def serve_image():
     """Serve an image file directly"""
@@ -375,7 +821,53 @@ def serve_image():
     if ext not in IMAGE_EXTENSIONS:
         return jsonify({'error': 'Not an image'}), 400
 
-    return send_file(filepath)
+    # conditional=True answers Range requests (206) and If-None-Match (304);
+    # the file itself goes out via wsgi.file_wrapper/sendfile where the server provides it
+    stat = os.stat(filepath)
+    return send_file(filepath, conditional=True, etag=_file_etag(stat),
+                     last_modified=stat.st_mtime, max_age=IMAGE_MAX_AGE)
+
+EXIF_KEYS = frozenset((
+    'Make', 'Model', 'DateTime', 'ExposureTime', 'FNumber', 'ISOSpeedRatings',
+    'FocalLength', 'ImageWidth', 'ImageLength', 'Software',
+))
+EXIF_IFD_POINTER = 0x8769  # Sub-IFD holding exposure, aperture, ISO, focal length
+
+@lru_cache(maxsize=512)
+def _image_meta(path, mtime_ns, size, ext):
+    """Dimensions, format and basic EXIF from the image header, cached per file version"""
+    fallback = {'width': None, 'height': None, 'format': ext.lstrip('.')}
+    if Image is None:
+        # Pillow not available - return without dimensions
+        return fallback
+
+    try:
+        # Image.open only parses the header; pixel data is never decoded here
+        with Image.open(path) as img:
+            meta = {
+                'width': img.width,
+                'height': img.height,
+                'format': img.format or ext.lstrip('.'),
+                'mode': img.mode,  # RGB, RGBA, L, etc.
+            }
+
+            # Basic EXIF data
+            exif_data = {}
+            try:
+                exif = img.getexif()
+                tags = dict(exif)
+                tags.update(exif.get_ifd(EXIF_IFD_POINTER))
+                for tag_id, value in tags.items():
+                    tag = TAGS.get(tag_id, tag_id)
+                    if tag in EXIF_KEYS:
+                        exif_data[tag] = str(value)
+            except Exception:
+                pass
+            if exif_data:
+                meta['exif'] = exif_data
+        return meta
+    except Exception:
+        return fallback
 
 @app.route('/api/image/info')
 def image_info():
@@ -393,6 +885,9 @@ def image_info():
         return jsonify({'error': 'Not an image'}), 400
 
     stat = os.stat(filepath)
+    if request.if_none_match.contains_weak(_file_etag(stat)):
+        return _conditional_json({}, stat)
+
     info = {
         'success': True,
         'file': filepath,
@@ -405,47 +900,30 @@ def image_info():
         'created': datetime.fromtimestamp(stat.st_ctime).strftime('%Y-%m-%d %H:%M:%S'),
     }
 
-    # Try to get dimensions with Pillow
-    try:
-        from PIL import Image
-        from PIL.ExifTags import TAGS
-        img = Image.open(filepath)
-        info['width'] = img.width
-        info['height'] = img.height
-        info['format'] = img.format or ext.lstrip('.')
-        info['mode'] = img.mode  # RGB, RGBA, L, etc.
-
-        # Basic EXIF data
-        exif_data = {}
-        try:
-            raw_exif = img._getexif()
-            if raw_exif:
-                for tag_id, value in raw_exif.items():
-                    tag = TAGS.get(tag_id, tag_id)
-                    if tag in ('Make', 'Model', 'DateTime', 'ExposureTime',
-                               'FNumber', 'ISOSpeedRatings', 'FocalLength',
-                               'ImageWidth', 'ImageLength', 'Software'):
-                        exif_data[tag] = str(value)
-        except Exception:
-            pass
-        if exif_data:
-            info['exif'] = exif_data
-
-        img.close()
-    except ImportError:
-        # Pillow not available - return without dimensions
-        info['width'] = None
-        info['height'] = None
-        info['format'] = ext.lstrip('.')
-    except Exception as e:
-        info['width'] = None
-        info['height'] = None
-        info['format'] = ext.lstrip('.')
+    info.update(_image_meta(filepath, stat.st_mtime_ns, stat.st_size, ext))
 
-    return jsonify(info)
+    return _conditional_json(info, stat)
 
 # ── API: File Operations (optional, config-gated) ───────────────────────────
 
+# copy_file_range can't handle this pair of files/filesystems; fall back to a regular copy
+_COPY_RANGE_FALLBACK_ERRNOS = frozenset((errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP))
+
+def _fast_copy(src, dst):
+    """Like shutil.copy2, but copies file data in-kernel with os.copy_file_range"""
+    if not hasattr(os, 'copy_file_range'):
+        return shutil.copy2(src, dst)
+    try:
+        with open(src, 'rb') as fsrc, open(dst, 'wb') as fdst:
+            while os.copy_file_range(fsrc.fileno(), fdst.fileno(), 1 << 30):
+                pass
+    except OSError as e:
+        if e.errno not in _COPY_RANGE_FALLBACK_ERRNOS:
+            raise
+        return shutil.copy2(src, dst)
+    shutil.copystat(src, dst)
+    return dst
+
 @app.route('/api/files/copy', methods=['POST'])
 def file_copy():
     """Copy a file or directory"""
@@ -467,10 +945,10 @@ def file_copy():
 
     try:
         if os.path.isdir(source):
-            shutil.copytree(source, destination)
+            shutil.copytree(source, destination, copy_function=_fast_copy)
         else:
             os.makedirs(os.path.dirname(destination), exist_ok=True)
-            shutil.copy2(source, destination)
+            _fast_copy(source, destination)
         return jsonify({'success': True, 'destination': destination})
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -615,9 +1093,11 @@ def file_new_folder():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
-# ── Init (for both gunicorn and direct run) ──────────────────────────────────
+# ── Init (for gunicorn, serve.py and direct run) ─────────────────────────────
 
 load_config()
+INDEX_GZ_AVAILABLE = prepare_index_gz()
+prune_render_cache()
 cors_origins = CONFIG.get('cors_origins', ['http://192.168.178.*'])
 CORS(app, origins=cors_origins)
 
@@ -0,0 +1,18 @@
+#!/usr/bin/env python3
+"""
+FileView - Production server entrypoint
+Runs the app under waitress (pure Python, works on Linux, macOS and Windows).
+"""
+
+from waitress import serve
+
+from fileview import app, CONFIG, cors_origins
+
+if __name__ == '__main__':
+    host = CONFIG.get('host', '0.0.0.0')
+    port = CONFIG.get('port', 8080)
+    threads = CONFIG.get('threads', 8)
+    print(f"FileView (waitress, {threads} threads) starting on http://{host}:{port}")
+    print(f"Allowed paths: {CONFIG.get('allowed_paths', [])}")
+    print(f"CORS origins: {cors_origins}")
+    serve(app, host=host, port=port, threads=threads)